@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 import torch
 import pickle
 
-from tmrl.util import collate_torch
+from tmrl.util import cached_property, collate_torch
 
 
 __docformat__ = "google"
@@ -129,8 +129,34 @@ class TorchActorModule(ActorModule, torch.nn.Module, ABC):
         # super().__init__()  # torch.nn.Module
         self.device = device
 
+    # CPU copy of the state_dict reused across calls to cpu_state_dict (not pickled):
+    _cpu_shadow = cached_property(lambda self: {})
+
+    def cpu_state_dict(self):
+        """
+        Returns the state_dict of the module with all tensors on CPU.
+
+        Tensors living on a CUDA device are copied into page-locked CPU buffers that are reused across calls.
+        All the copies are issued asynchronously and waited for at once.
+        The returned tensors are overwritten by the next call.
+        """
+        state_dict = self.state_dict()
+        if not any(v.is_cuda for v in state_dict.values()):
+            return state_dict
+        shadow = self._cpu_shadow
+        devices = set()
+        for k, v in state_dict.items():
+            if k not in shadow or shadow[k].shape != v.shape or shadow[k].dtype != v.dtype:
+                shadow[k] = torch.empty(v.shape, dtype=v.dtype, pin_memory=v.is_cuda)
+            shadow[k].copy_(v, non_blocking=True)
+            if v.is_cuda:
+                devices.add(v.device)
+        for device in devices:
+            torch.cuda.current_stream(device).synchronize()  # the copies are issued on the current stream of their device
+        return {k: shadow[k] for k in state_dict}
+
     def save(self, path):
-        torch.save(self.state_dict(), path)
+        torch.save(self.cpu_state_dict(), path)
 
     def load(self, path, device):
         self.device = device
@@ -18,6 +18,11 @@ import tmrl.config.config_constants as cfg
 import logging
 
 
+def _bf16_autocast(enabled, device_type):
+    # bfloat16 autocast of the forward passes of the online networks (losses, backups and updates stay float32)
+    return torch.autocast(device_type=device_type, dtype=torch.bfloat16, enabled=enabled)
+
+
 # Soft Actor-Critic ====================================================================================================
 
 
@@ -41,6 +46,8 @@ class SpinupSacAgent(TrainingAgent):  # Adapted from Spinup
     betas_critic: tuple = None  # for Adam and AdamW
     l2_actor: float = None  # weight decay
     l2_critic: float = None  # weight decay
+    channels_last: bool = False  # if True, the model uses the channels_last memory format (useful for convolutional models)
+    bf16_autocast: bool = False  # if True, the forward passes of the online networks run under bfloat16 autocast (targets, losses and updates remain float32)
 
     model_nograd = cached_property(lambda self: no_grad(copy_shared(self.model)))
 
@@ -48,6 +55,8 @@ class SpinupSacAgent(TrainingAgent):  # Adapted from Spinup
         observation_space, action_space = self.observation_space, self.action_space
         device = self.device or ("cuda" if torch.cuda.is_available() else "cpu")
         model = self.model_cls(observation_space, action_space)
+        if self.channels_last:
+            model = model.to(memory_format=torch.channels_last)
         logging.debug(f" device SAC: {device}")
         self.model = model.to(device)
         self.model_target = no_grad(deepcopy(self.model))
@@ -108,8 +117,11 @@ class SpinupSacAgent(TrainingAgent):  # Adapted from Spinup
     def train(self, batch):
 
         o, a, r, o2, d, _ = batch
+        device_type = a.device.type
 
-        pi, logp_pi = self.model.actor(o)
+        with _bf16_autocast(self.bf16_autocast, device_type):
+            pi, logp_pi = self.model.actor(o)
+        pi, logp_pi = pi.float(), logp_pi.float()
         # FIXME? log_prob = log_prob.reshape(-1, 1)
 
         # loss_alpha:
@@ -135,11 +147,13 @@ class SpinupSacAgent(TrainingAgent):  # Adapted from Spinup
 
         # loss_q:
 
-        q1 = self.model.q1(o, a)
-        q2 = self.model.q2(o, a)
+        with _bf16_autocast(self.bf16_autocast, device_type):
+            q1 = self.model.q1(o, a)
+            q2 = self.model.q2(o, a)
+        q1, q2 = q1.float(), q2.float()
 
         # Bellman backup for Q functions
-        with torch.no_grad():
+        with torch.no_grad(), _bf16_autocast(False, device_type):
             # Target actions come from *current* policy
             a2, logp_a2 = self.model.actor(o2)
 
@@ -168,9 +182,10 @@ class SpinupSacAgent(TrainingAgent):  # Adapted from Spinup
         # loss_pi:
 
         # pi, logp_pi = self.model.actor(o)
-        q1_pi = self.model.q1(o, pi)
-        q2_pi = self.model.q2(o, pi)
-        q_pi = torch.min(q1_pi, q2_pi)
+        with _bf16_autocast(self.bf16_autocast, device_type):
+            q1_pi = self.model.q1(o, pi)
+            q2_pi = self.model.q2(o, pi)
+        q_pi = torch.min(q1_pi.float(), q2_pi.float())
 
         # Entropy-regularized policy loss
         loss_pi = (alpha_t * logp_pi - q_pi).mean()
@@ -312,6 +327,8 @@ class REDQSACAgent(TrainingAgent):
     n: int = 10  # number of REDQ parallel Q networks
     m: int = 2  # number of REDQ randomly sampled target networks
     q_updates_per_policy_update: int = 1  # in REDQ, this is the "UTD ratio" (20), this interplays with lr_actor
+    channels_last: bool = False  # if True, the model uses the channels_last memory format (useful for convolutional models)
+    bf16_autocast: bool = False  # if True, the forward passes of the online networks run under bfloat16 autocast (targets, losses and updates remain float32)
 
     model_nograd = cached_property(lambda self: no_grad(copy_shared(self.model)))
 
@@ -319,6 +336,8 @@ class REDQSACAgent(TrainingAgent):
         observation_space, action_space = self.observation_space, self.action_space
         device = self.device or ("cuda" if torch.cuda.is_available() else "cpu")
         model = self.model_cls(observation_space, action_space)
+        if self.channels_last:
+            model = model.to(memory_format=torch.channels_last)
         logging.debug(f" device REDQ-SAC: {device}")
         self.model = model.to(device)
         self.model_target = no_grad(deepcopy(self.model))
@@ -349,9 +368,12 @@ class REDQSACAgent(TrainingAgent):
         update_policy = (self.i_update % self.q_updates_per_policy_update == 0)
 
         o, a, r, o2, d, _ = batch
+        device_type = a.device.type
 
         if update_policy:
-            pi, logp_pi = self.model.actor(o)
+            with _bf16_autocast(self.bf16_autocast, device_type):
+                pi, logp_pi = self.model.actor(o)
+            pi, logp_pi = pi.float(), logp_pi.float()
         # FIXME? log_prob = log_prob.reshape(-1, 1)
 
         loss_alpha = None
@@ -366,7 +388,7 @@ class REDQSACAgent(TrainingAgent):
             loss_alpha.backward()
             self.alpha_optimizer.step()
 
-        with torch.no_grad():
+        with torch.no_grad(), _bf16_autocast(False, device_type):
             a2, logp_a2 = self.model.actor(o2)
 
             sample_idxs = np.random.choice(self.n, self.m, replace=False)
@@ -376,8 +398,9 @@ class REDQSACAgent(TrainingAgent):
             min_q, _ = torch.min(q_prediction_next_cat, dim=1, keepdim=True)
             backup = r.unsqueeze(dim=-1) + self.gamma * (1 - d.unsqueeze(dim=-1)) * (min_q - alpha_t * logp_a2.unsqueeze(dim=-1))
 
-        q_prediction_list = [q(o, a) for q in self.model.qs]
-        q_prediction_cat = torch.stack(q_prediction_list, -1)
+        with _bf16_autocast(self.bf16_autocast, device_type):
+            q_prediction_list = [q(o, a) for q in self.model.qs]
+        q_prediction_cat = torch.stack(q_prediction_list, -1).float()
         backup = backup.expand((-1, self.n)) if backup.shape[1] == 1 else backup
 
         loss_q = self.criterion(q_prediction_cat, backup)  # * self.n  # averaged for homogeneity with SAC
@@ -390,8 +413,9 @@ class REDQSACAgent(TrainingAgent):
             for q in self.model.qs:
                 q.requires_grad_(False)
 
-            qs_pi = [q(o, pi) for q in self.model.qs]
-            qs_pi_cat = torch.stack(qs_pi, -1)
+            with _bf16_autocast(self.bf16_autocast, device_type):
+                qs_pi = [q(o, pi) for q in self.model.qs]
+            qs_pi_cat = torch.stack(qs_pi, -1).float()
             ave_q = torch.mean(qs_pi_cat, dim=1, keepdim=True)
             loss_pi = (alpha_t * logp_pi.unsqueeze(dim=-1) - ave_q).mean()
             self.pi_optimizer.zero_grad()
@@ -1,7 +1,10 @@
 import random
 import numpy as np
+import torch
 
+import tmrl.config.config_constants as cfg
 from tmrl.memory import TorchMemory
+from tmrl.util import cached_property
 
 
 # LOCAL BUFFER COMPRESSION ==============================
@@ -18,11 +21,12 @@ def get_local_buffer_sample_lidar(prev_act, obs, rew, terminated, truncated, inf
     the user must define both this function and the append() method of the memory
     CAUTION: prev_act is the action that comes BEFORE obs (i.e. prev_obs, prev_act(prev_obs), obs(prev_act))
     """
-    obs_mod = (obs[0], obs[1][-19:])  # speed and most recent LIDAR only
-    rew_mod = np.float32(rew)
+    obs_mod = (obs[0], obs[1][-19:].astype(np.int16))  # speed and most recent LIDAR only (integer distances)
+    rew_mod = float(rew)  # cast to float32 once per buffer by the memory
     terminated_mod = terminated
     truncated_mod = truncated
-    return prev_act, obs_mod, rew_mod, terminated_mod, truncated_mod, info
+    info_mod = info if cfg.CRC_DEBUG else None  # info is only used for CRC debugging
+    return prev_act, obs_mod, rew_mod, terminated_mod, truncated_mod, info_mod
 
 
 def get_local_buffer_sample_lidar_progress(prev_act, obs, rew, terminated, truncated, info):
@@ -36,11 +40,12 @@ def get_local_buffer_sample_lidar_progress(prev_act, obs, rew, terminated, trunc
     the user must define both this function and the append() method of the memory
     CAUTION: prev_act is the action that comes BEFORE obs (i.e. prev_obs, prev_act(prev_obs), obs(prev_act))
     """
-    obs_mod = (obs[0], obs[1], obs[2][-19:])  # speed and most recent LIDAR only
-    rew_mod = np.float32(rew)
+    obs_mod = (obs[0], obs[1], obs[2][-19:].astype(np.int16))  # speed and most recent LIDAR only (integer distances)
+    rew_mod = float(rew)  # cast to float32 once per buffer by the memory
     terminated_mod = terminated
     truncated_mod = truncated
-    return prev_act, obs_mod, rew_mod, terminated_mod, truncated_mod, info
+    info_mod = info if cfg.CRC_DEBUG else None  # info is only used for CRC debugging
+    return prev_act, obs_mod, rew_mod, terminated_mod, truncated_mod, info_mod
 
 
 def get_local_buffer_sample_tm20_imgs(prev_act, obs, rew, terminated, truncated, info):
@@ -56,11 +61,13 @@ def get_local_buffer_sample_tm20_imgs(prev_act, obs, rew, terminated, truncated,
     CAUTION: prev_act is the action that comes BEFORE obs (i.e. prev_obs, prev_act(prev_obs), obs(prev_act))
     """
     prev_act_mod = prev_act
-    obs_mod = (obs[0], obs[1], obs[2], (obs[3][-1] * 256.0).astype(np.uint8))
+    img = obs[3][-1]
+    img_mod = np.multiply(img, 256.0, out=np.empty(img.shape, dtype=np.uint8), casting='unsafe')  # no float temporary
+    obs_mod = (obs[0], obs[1], obs[2], img_mod)
     rew_mod = rew
     terminated_mod = terminated
     truncated_mod = truncated
-    info_mod = info
+    info_mod = info if cfg.CRC_DEBUG else None  # info is only used for CRC debugging
     return prev_act_mod, obs_mod, rew_mod, terminated_mod, truncated_mod, info_mod
 
 
@@ -68,30 +75,38 @@ def get_local_buffer_sample_tm20_imgs(prev_act, obs, rew, terminated, truncated,
 
 
 def last_true_in_list(li):
-    for i in reversed(range(len(li))):
-        if li[i]:
-            return i
-    return None
+    res = np.flatnonzero(li)
+    return int(res[-1]) if len(res) > 0 else None
 
 
 def replace_hist_before_eoe(hist, eoe_idx_in_hist):
     """
-    Pads the history hist before the End Of Episode (EOE) index.
+    Pads the history hist (a numpy array) before the End Of Episode (EOE) index.
 
     Previous entries in hist are padded with copies of the first element occurring after EOE.
     """
     last_idx = len(hist) - 1
     assert eoe_idx_in_hist <= last_idx, f"replace_hist_before_eoe: eoe_idx_in_hist:{eoe_idx_in_hist}, last_idx:{last_idx}"
     if 0 <= eoe_idx_in_hist < last_idx:
-        for i in reversed(range(len(hist))):
-            if i <= eoe_idx_in_hist:
-                hist[i] = hist[i + 1]
+        hist[:eoe_idx_in_hist + 1] = hist[eoe_idx_in_hist + 1]
+
+
+def _slice_batch(batch, s):
+    if isinstance(batch, tuple):
+        return tuple(_slice_batch(b, s) for b in batch)
+    return batch[s]
 
 
 # SUPPORTED CUSTOM MEMORIES ============================================================================================
 
 
 class GenericTorchMemory(TorchMemory):
+    """
+    Circular replay memory storing the raw samples of the buffers.
+
+    `data` holds 7 fixed-length lists (actions, observations, rewards, terminated, truncated, infos, done),
+    with room for `memory_size` transitions, written in place at `write_pos`.
+    """
     def __init__(self,
                  memory_size=1e6,
                  batch_size=1,
@@ -99,59 +114,80 @@ class GenericTorchMemory(TorchMemory):
                  nb_steps=1,
                  sample_preprocessor: callable = None,
                  crc_debug=False,
-                 device="cpu"):
+                 device="cpu",
+                 nb_workers=0,
+                 pin_memory=False,
+                 prefetch_factor=2):
+        self.write_pos = 0  # position of the next sample in the circular buffer
+        self.nb_samples = 0  # number of samples currently stored
         super().__init__(memory_size=memory_size,
                          batch_size=batch_size,
                          dataset_path=dataset_path,
                          nb_steps=nb_steps,
                          sample_preprocessor=sample_preprocessor,
                          crc_debug=crc_debug,
-                         device=device)
+                         device=device,
+                         nb_workers=nb_workers,
+                         pin_memory=pin_memory,
+                         prefetch_factor=prefetch_factor)
+        self._set_data(self.data)  # datasets are stored in chronological order
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "nb_samples" not in state:  # checkpoint of a memory without circular buffer
+            self.write_pos = 0
+            self.nb_samples = 0
+            self._set_data(self.data)
+
+    def _index(self, item):
+        """
+        Position in the circular buffer of the `item`-th oldest stored sample.
+        """
+        return (self.write_pos - self.nb_samples + item) % len(self.data[0])
+
+    def _set_data(self, data):
+        """
+        Stores the most recent samples of `data` (7 lists in chronological order) in a new circular buffer.
+        """
+        if len(data) == 0:
+            self.data = []
+            return
+        size = int(self.memory_size) + 1  # room for memory_size transitions
+        n = min(len(data[0]), size)
+        self.data = [list(d[len(d) - n:]) + [None] * (size - n) for d in data]
+        self.nb_samples = n
+        self.write_pos = n % size
 
     def append_buffer(self, buffer):
 
-        # parse:
-        d0 = [b[0] for b in buffer.memory]  # actions
-        d1 = [b[1] for b in buffer.memory]  # observations
-        d2 = [b[2] for b in buffer.memory]  # rewards
-        d3 = [b[3] for b in buffer.memory]  # terminated
-        d4 = [b[4] for b in buffer.memory]  # truncated
-        d5 = [b[5] for b in buffer.memory]  # info
-        d6 = [b[3] or b[4] for b in buffer.memory]  # done
-
-        # append:
-        if self.__len__() > 0:
-            self.data[0] += d0
-            self.data[1] += d1
-            self.data[2] += d2
-            self.data[3] += d3
-            self.data[4] += d4
-            self.data[5] += d5
-            self.data[6] += d6
-        else:
-            self.data.append(d0)
-            self.data.append(d1)
-            self.data.append(d2)
-            self.data.append(d3)
-            self.data.append(d4)
-            self.data.append(d5)
-            self.data.append(d6)
-
-        # trim
-        to_trim = int(self.__len__() - self.memory_size)
-        if to_trim > 0:
-            self.data[0] = self.data[0][to_trim:]
-            self.data[1] = self.data[1][to_trim:]
-            self.data[2] = self.data[2][to_trim:]
-            self.data[3] = self.data[3][to_trim:]
-            self.data[4] = self.data[4][to_trim:]
-            self.data[5] = self.data[5][to_trim:]
-            self.data[6] = self.data[6][to_trim:]
+        # parse (in a single pass over the samples):
+        d0, d1, d2, d3, d4, d5 = zip(*buffer.memory)  # actions, observations, rewards, terminated, truncated, info
+        d6 = [te or tr for te, tr in zip(d3, d4)]  # done
+        if not self.crc_debug:
+            d5 = (None, ) * len(d5)  # info is only used for CRC debugging
 
-    def __len__(self):
+        # allocate:
+        size = int(self.memory_size) + 1  # room for memory_size transitions
         if len(self.data) == 0:
-            return 0
-        res = len(self.data[0]) - 1
+            self.data = [[None] * size for _ in range(7)]
+        elif len(self.data[0]) != size:  # memory_size has been updated
+            start = self._index(0)
+            self._set_data([(d[start:] + d[:start])[:self.nb_samples] for d in self.data])
+
+        # write in place, overwriting the oldest samples:
+        n = len(d0)
+        skip = max(0, n - size)  # samples that would be overwritten within this buffer
+        n -= skip
+        n_end = min(n, size - self.write_pos)  # samples written before wrapping around
+        for column, values in zip(self.data, (d0, d1, d2, d3, d4, d5, d6)):
+            values = values[skip:]
+            column[self.write_pos:self.write_pos + n_end] = values[:n_end]
+            column[:n - n_end] = values[n_end:]
+        self.write_pos = (self.write_pos + n) % size
+        self.nb_samples = min(self.nb_samples + n, size)
+
+    def __len__(self):
+        res = self.nb_samples - 1
         if res < 0:
             return 0
         else:
@@ -161,11 +197,11 @@ class GenericTorchMemory(TorchMemory):
 
         # This is a hack to avoid invalid transitions from terminal to initial
         # TODO: find a way to only index valid transitions instead
-        while self.data[6][item]:
+        while self.data[6][self._index(item)]:
             item = random.randint(a=0, b=self.__len__() - 1)
 
-        idx_last = item
-        idx_now = item + 1
+        idx_last = self._index(item)
+        idx_now = self._index(item + 1)
 
         last_obs = self.data[1][idx_last]
         new_act = self.data[0][idx_now]
@@ -179,6 +215,35 @@ class GenericTorchMemory(TorchMemory):
 
 
 class MemoryTM(TorchMemory):
+    """
+    Circular replay memory for TrackMania.
+
+    Samples are stored as a struct of arrays: each of the `columns` is a pre-allocated NumPy array with room for
+    `memory_size` transitions, written in place at `write_pos`.
+    The first `min_samples + 1` rows of each column are duplicated after its end, so that the histories of a
+    transition are always contiguous views of the column, even when they wrap around the circular buffer.
+    Columns are allocated when the first buffer is appended, as their shapes and dtypes are those of the samples.
+
+    With `device_storage`, a copy of each column (but infos) is also kept as a torch tensor on `device`.
+    Appended samples are copied to these tensors once, and batches are then gathered directly on `device`.
+
+    With `fetch_factor` > 1, iterating over the memory gathers `fetch_factor` batches at once,
+    and yields them as slices of the gathered tensors.
+    """
+    columns = ()  # names of the stored columns, in the order of legacy list-based datasets (after sample indexes)
+    # dtypes cast once when samples are appended, so that batches never need a cast (other columns keep their dtype):
+    column_dtypes = {"actions": np.float32,
+                     "eoes": np.bool_,
+                     "rewards": np.float32,
+                     "infos": object,
+                     "terminated": np.bool_,
+                     "truncated": np.bool_}
+    device_storage = False  # default for memories checkpointed before device_storage existed
+    fetch_factor = 1
+    _tensors = None
+    # page-locked buffers reused to gather batches before their transfer to a CUDA device (not pickled):
+    _staging = cached_property(lambda self: {} if self.device is not None and torch.device(self.device).type == "cuda" else None)
+
     def __init__(self,
                  memory_size=None,
                  batch_size=None,
@@ -188,27 +253,175 @@ class MemoryTM(TorchMemory):
                  nb_steps=1,
                  sample_preprocessor: callable = None,
                  crc_debug=False,
-                 device="cpu"):
+                 device="cpu",
+                 nb_workers=0,
+                 pin_memory=False,
+                 prefetch_factor=2,
+                 device_storage=False,
+                 fetch_factor=1):
         self.imgs_obs = imgs_obs
         self.act_buf_len = act_buf_len
         self.min_samples = max(self.imgs_obs, self.act_buf_len)
         self.start_imgs_offset = max(0, self.min_samples - self.imgs_obs)
         self.start_acts_offset = max(0, self.min_samples - self.act_buf_len)
+        self.write_pos = 0  # position of the next sample in the circular buffer
+        self.nb_samples = 0  # number of samples currently stored
+        self._capacity = 0  # length of the allocated columns
+        self.device_storage = device_storage
+        self.fetch_factor = fetch_factor
+        self._tensors = None  # copies of the columns on device, when device_storage is True
+        for name in self.columns:
+            setattr(self, name, None)
         super().__init__(memory_size=memory_size,
                          batch_size=batch_size,
                          dataset_path=dataset_path,
                          nb_steps=nb_steps,
                          sample_preprocessor=sample_preprocessor,
                          crc_debug=crc_debug,
-                         device=device)
+                         device=device,
+                         nb_workers=nb_workers,
+                         pin_memory=pin_memory,
+                         prefetch_factor=prefetch_factor)
+        self._load_legacy_data()
+
+    def __getstate__(self):
+        # only the stored samples are pickled, in chronological order
+        state = self.__dict__.copy()
+        if self._capacity:
+            for name in self.columns:
+                state[name] = self._window(getattr(self, name), 0, self.nb_samples)
+            state["write_pos"] = 0
+            state["_capacity"] = self.nb_samples
+        state["_tensors"] = None  # rebuilt from the columns when unpickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "nb_samples" not in state:  # checkpoint of a list-based memory
+            self.write_pos = 0
+            self.nb_samples = 0
+            self._capacity = 0
+            for name in self.columns:
+                setattr(self, name, None)
+            self._load_legacy_data()
+        elif getattr(self, self.columns[0]) is not None:
+            self._reallocate(int(self.memory_size) + self.min_samples + 1)
+
+    def _load_legacy_data(self):
+        # legacy data is a list of columns, the first of which holds sample indexes
+        if len(self.data) > 0:
+            self.append_columns(**dict(zip(self.columns, self.data[1:])))
+        self.data = []
+
+    @staticmethod
+    def _write(out, values):
+        # values are written directly into the memory, without building an intermediate array
+        if out.dtype == object:
+            out[:] = values
+        else:
+            np.stack(values, out=out)
+
+    def _index(self, item):
+        """
+        Position in the circular buffer of the `item`-th oldest stored sample (`item` can be an array).
+        """
+        return (self.write_pos - self.nb_samples + item) % self._capacity
+
+    def _window(self, column, item, n):
+        """
+        `n` consecutive samples of `column`, starting from the `item`-th oldest.
+
+        This is a view of the column unless the window wraps around the end of the circular buffer further than
+        the duplicated rows (i.e., never for histories).
+        """
+        start = self._index(item)
+        stop = start + n
+        if stop <= len(column):
+            return column[start:stop]
+        return np.concatenate((column[start:self._capacity], column[:stop - self._capacity]))
+
+    def _reallocate(self, size):
+        """
+        Moves the most recent samples to new columns of length `size`, in chronological order.
+        """
+        n = min(self.nb_samples, size)
+        headroom = self.min_samples + 1
+        for name in self.columns:
+            old = getattr(self, name)
+            new = np.empty((size + headroom, *old.shape[1:]), dtype=old.dtype)
+            if n > 0:
+                new[:n] = self._window(old, self.nb_samples - n, n)
+                new[size:] = new[:headroom]
+            setattr(self, name, new)
+        self._capacity = size
+        self.nb_samples = n
+        self.write_pos = n % size
+        self._allocate_tensors()
+
+    def _allocate_tensors(self):
+        """
+        Copies the columns (but object columns) to new tensors on `device`, if `device_storage` is True.
+
+        Device storage is not used with DataLoader workers, which sample transitions one by one.
+        """
+        if self.device_storage and self.nb_workers <= 0:
+            self._tensors = {name: torch.from_numpy(getattr(self, name)).to(self.device, copy=True)
+                             for name in self.columns if getattr(self, name).dtype != object}
+
+    def _update_tensors(self, start, stop):
+        # rows [start:stop] of the columns have been overwritten
+        for name, tensor in self._tensors.items():
+            tensor[start:stop] = torch.from_numpy(getattr(self, name)[start:stop]).to(self.device)
+
+    def append_columns(self, **columns):
+        """
+        Writes a batch of samples in the circular buffer, overwriting the oldest samples when full.
+
+        Args:
+            columns: one sequence of values per name in `self.columns`, all of the same length
+                (object columns can be None, they are then left untouched, e.g. infos without CRC debugging)
+        """
+        size = int(self.memory_size) + self.min_samples + 1  # room for memory_size transitions
+        headroom = self.min_samples + 1  # rows duplicated after the end of the circular buffer
+        n = len(columns[self.columns[0]])
+        if n == 0:
+            return
+        skip = max(0, n - size)  # samples that would be overwritten within this batch
+        n -= skip
+        if getattr(self, self.columns[0]) is None:
+            for name in self.columns:
+                if columns[name] is None:
+                    setattr(self, name, np.empty(size + headroom, dtype=object))  # filled with None
+                    continue
+                first = np.asarray(columns[name][skip], dtype=self.column_dtypes.get(name))
+                setattr(self, name, np.empty((size + headroom, *first.shape), dtype=first.dtype))
+            self._capacity = size
+            self._allocate_tensors()
+        elif self._capacity != size:  # memory_size has been updated
+            self._reallocate(size)
+        n_end = min(n, size - self.write_pos)  # samples written before wrapping around
+        for name in self.columns:
+            if columns[name] is None:
+                continue
+            column = getattr(self, name)
+            values = columns[name][skip:]
+            self._write(column[self.write_pos:self.write_pos + n_end], values[:n_end])
+            if n_end < n:
+                self._write(column[:n - n_end], values[n_end:])
+            if self.write_pos < headroom or n_end < n:  # duplicated rows have been overwritten
+                column[size:] = column[:headroom]
+        if self._tensors is not None:  # one copy per contiguous slice of the circular buffer
+            self._update_tensors(self.write_pos, self.write_pos + n_end)
+            if n_end < n:
+                self._update_tensors(0, n - n_end)
+        self.write_pos = (self.write_pos + n) % size
+        self.nb_samples = min(self.nb_samples + n, size)
 
     def append_buffer(self, buffer):
         raise NotImplementedError
 
     def __len__(self):
-        if len(self.data) == 0:
-            return 0
-        res = len(self.data[0]) - self.min_samples - 1
+        res = self.nb_samples - self.min_samples - 1
         if res < 0:
             return 0
         else:
@@ -217,8 +430,100 @@ class MemoryTM(TorchMemory):
     def get_transition(self, item):
         raise NotImplementedError
 
+    def get_transitions(self, items):
+        """
+        Batched version of `get_transition` (without info).
+
+        Args:
+            items (numpy.ndarray): 1D array of indexes where to sample
+
+        Returns:
+            Tuple: (prev_obs, new_act, rew, new_obs, terminated, truncated) of tensors of batch dimension len(items),
+            on `device`
+        """
+        raise NotImplementedError
+
+    def _batched(self):
+        # transitions need to be checked / preprocessed one by one with CRC debugging or a sample_preprocessor,
+        # and subclasses may implement only get_transition
+        return not self.crc_debug and self.sample_preprocessor is None and type(self).get_transitions is not MemoryTM.get_transitions
+
+    def sample(self):
+        if not self._batched():
+            return super().sample()
+        return self.get_transitions(np.asarray(self.sample_indices(), dtype=np.int64))
+
+    def __iter__(self):
+        if self.fetch_factor <= 1 or self.nb_workers > 0 or not self._batched():
+            yield from super().__iter__()
+            return
+        for step in range(0, self.nb_steps, self.fetch_factor):
+            nb_batches = min(self.fetch_factor, self.nb_steps - step)
+            items = np.concatenate([np.asarray(self.sample_indices(), dtype=np.int64) for _ in range(nb_batches)])
+            transitions = self.get_transitions(items)
+            for i in range(nb_batches):
+                yield _slice_batch(transitions, slice(i * self.batch_size, (i + 1) * self.batch_size))
+
+    def _gather(self, name, idx):
+        """
+        Samples of column `name` at positions `idx` (a NumPy array of any shape), in a tensor on `device`.
+        """
+        if self._tensors is None:
+            column = getattr(self, name)
+            if self._staging is None:
+                return torch.from_numpy(column[idx]).to(self.device)
+            key = (name, idx.shape)
+            staging = self._staging.get(key)
+            if staging is None:
+                staging = torch.from_numpy(np.empty((*idx.shape, *column.shape[1:]), dtype=column.dtype)).pin_memory()
+                self._staging[key] = staging
+            np.take(column, idx, axis=0, out=staging.numpy(), mode="clip")  # indexes are in range, "clip" avoids buffering
+            return staging.to(self.device)  # blocking copy, the buffer can be reused right after
+        tensor = self._tensors[name]
+        idx_tensor = torch.from_numpy(idx.reshape(-1)).to(self.device)
+        return tensor.index_select(0, idx_tensor).reshape(*idx.shape, *tensor.shape[1:])
+
+    def _batch_indices(self, items):
+        """
+        Batched index computations of `get_transition`.
+
+        Returns:
+            Tuple: (items, idx_last, idx_now, last_eoe_idx), where last_eoe_idx is -1 for histories without end of episode
+        """
+        min_samples = self.min_samples
+        eoes = self.eoes[self._index(items + min_samples - 1)]
+        if eoes.any():  # same shifts as in get_transition
+            shifts = np.where(np.random.random(len(items)) < 0.5, 1, -1)
+            shifts[items == self.__len__() - 1] = -1
+            shifts[items == 0] = 1
+            items = np.where(eoes, items + shifts, items)
+        idx_last = self._index(items + min_samples - 1)
+        idx_now = self._index(items + min_samples)
+        last_eoes = self.eoes[self._index(items[:, None] + np.arange(min_samples))]  # (batch, min_samples)
+        last_eoe_idx = min_samples - 1 - np.argmax(last_eoes[:, ::-1], axis=1)  # last occurrence of True
+        last_eoe_idx[~last_eoes.any(axis=1)] = -1
+        return items, idx_last, idx_now, last_eoe_idx
+
+    def _gather_hists(self, name, items, offset, hist_len, last_eoe_idx):
+        """
+        Gathers the last and new histories of column `name` for a batch of `items`.
+
+        Padding before the last end of episode (see `replace_hist_before_eoe`) is done by clamping the gathered indexes.
+
+        Returns:
+            Tuple: (last_hist, new_hist), both of shape (len(items), hist_len, ...)
+        """
+        hist_idx = np.arange(hist_len)
+        eoe_idx = (last_eoe_idx - offset)[:, None]  # index of the end of episode in the last history
+        last_src = np.where(eoe_idx < hist_len - 1, np.maximum(hist_idx, eoe_idx + 1), hist_idx)
+        new_src = np.maximum(hist_idx, eoe_idx)  # the new history is shifted by one sample
+        start = items[:, None] + offset
+        return self._gather(name, self._index(start + last_src)), self._gather(name, self._index(start + 1 + new_src))
+
 
 class MemoryTMLidar(MemoryTM):
+    columns = ("actions", "speeds", "imgs", "eoes", "rewards", "infos", "terminated", "truncated")
+
     def get_transition(self, item):
         """
         CAUTION: item is the first index of the 4 images in the images history of the OLD observation
@@ -228,7 +533,9 @@ class MemoryTMLidar(MemoryTM):
         So we load 5 images from here...
         Don't forget the info dict for CRC debugging
         """
-        if self.data[4][item + self.min_samples - 1]:
+        min_samples = self.min_samples
+        eoes = self.eoes
+        if eoes[self._index(item + min_samples - 1)]:
             if item == 0:  # if first item of the buffer
                 item += 1
             elif item == self.__len__() - 1:  # if last item of the buffer
@@ -238,8 +545,8 @@ class MemoryTMLidar(MemoryTM):
             else:
                 item -= 1
 
-        idx_last = item + self.min_samples - 1
-        idx_now = item + self.min_samples
+        idx_last = self._index(item + min_samples - 1)
+        idx_now = self._index(item + min_samples)
 
         acts = self.load_acts(item)
         last_act_buf = acts[:-1]
@@ -250,92 +557,75 @@ class MemoryTMLidar(MemoryTM):
         imgs_new_obs = imgs[1:]
 
         # if a reset transition has influenced the observation, special care must be taken
-        last_eoes = self.data[4][idx_now - self.min_samples:idx_now]  # self.min_samples values
+        last_eoes = self._window(eoes, item, min_samples)  # min_samples values
         last_eoe_idx = last_true_in_list(last_eoes)  # last occurrence of True
 
         assert last_eoe_idx is None or last_eoes[last_eoe_idx], f"last_eoe_idx:{last_eoe_idx}"
 
         if last_eoe_idx is not None:
-            replace_hist_before_eoe(hist=new_act_buf, eoe_idx_in_hist=last_eoe_idx - self.start_acts_offset - 1)
-            replace_hist_before_eoe(hist=last_act_buf, eoe_idx_in_hist=last_eoe_idx - self.start_acts_offset)
-            replace_hist_before_eoe(hist=imgs_new_obs, eoe_idx_in_hist=last_eoe_idx - self.start_imgs_offset - 1)
-            replace_hist_before_eoe(hist=imgs_last_obs, eoe_idx_in_hist=last_eoe_idx - self.start_imgs_offset)
-
-        imgs_new_obs = np.ndarray.flatten(imgs_new_obs)
-        imgs_last_obs = np.ndarray.flatten(imgs_last_obs)
-
-        last_obs = (self.data[2][idx_last], imgs_last_obs, *last_act_buf)
-        new_act = self.data[1][idx_now]
-        rew = np.float32(self.data[5][idx_now])
-        new_obs = (self.data[2][idx_now], imgs_new_obs, *new_act_buf)
-        terminated = self.data[7][idx_now]
-        truncated = self.data[8][idx_now]
-        info = self.data[6][idx_now]
+            # histories are padded in place and must not be views of the memory (nor of each other)
+            last_act_buf, new_act_buf = last_act_buf.copy(), new_act_buf.copy()
+            imgs_last_obs, imgs_new_obs = imgs_last_obs.copy(), imgs_new_obs.copy()
+            eoe_idx_in_acts = last_eoe_idx - self.start_acts_offset
+            eoe_idx_in_imgs = last_eoe_idx - self.start_imgs_offset
+            replace_hist_before_eoe(hist=new_act_buf, eoe_idx_in_hist=eoe_idx_in_acts - 1)
+            replace_hist_before_eoe(hist=last_act_buf, eoe_idx_in_hist=eoe_idx_in_acts)
+            replace_hist_before_eoe(hist=imgs_new_obs, eoe_idx_in_hist=eoe_idx_in_imgs - 1)
+            replace_hist_before_eoe(hist=imgs_last_obs, eoe_idx_in_hist=eoe_idx_in_imgs)
+
+        imgs_new_obs = imgs_new_obs.astype(np.float32).ravel()  # LIDARs are stored as int16
+        imgs_last_obs = imgs_last_obs.astype(np.float32).ravel()
+
+        last_obs = (self.speeds[idx_last], imgs_last_obs, *last_act_buf)
+        new_act = self.actions[idx_now]
+        rew = self.rewards[idx_now]
+        new_obs = (self.speeds[idx_now], imgs_new_obs, *new_act_buf)
+        terminated = self.terminated[idx_now]
+        truncated = self.truncated[idx_now]
+        info = self.infos[idx_now]
         return last_obs, new_act, rew, new_obs, terminated, truncated, info
 
+    def get_transitions(self, items):
+        items, idx_last, idx_now, last_eoe_idx = self._batch_indices(items)
+        last_act_buf, new_act_buf = self._gather_hists("actions", items, self.start_acts_offset, self.act_buf_len, last_eoe_idx)
+        imgs_last_obs, imgs_new_obs = self._gather_hists("imgs", items, self.start_imgs_offset, self.imgs_obs, last_eoe_idx)
+        imgs_last_obs = imgs_last_obs.reshape(len(items), -1).float()  # LIDARs are stored as int16
+        imgs_new_obs = imgs_new_obs.reshape(len(items), -1).float()
+        last_obs = (self._gather("speeds", idx_last), imgs_last_obs, *last_act_buf.unbind(1))
+        new_act = self._gather("actions", idx_now)
+        rew = self._gather("rewards", idx_now)
+        new_obs = (self._gather("speeds", idx_now), imgs_new_obs, *new_act_buf.unbind(1))
+        terminated = self._gather("terminated", idx_now).float()  # we don't want bool tensors
+        truncated = self._gather("truncated", idx_now).float()
+        return last_obs, new_act, rew, new_obs, terminated, truncated
+
     def load_imgs(self, item):
-        res = self.data[3][(item + self.start_imgs_offset):(item + self.start_imgs_offset + self.imgs_obs + 1)]
-        return np.stack(res)
+        return self._window(self.imgs, item + self.start_imgs_offset, self.imgs_obs + 1)
 
     def load_acts(self, item):
-        res = self.data[1][(item + self.start_acts_offset):(item + self.start_acts_offset + self.act_buf_len + 1)]
-        return res
+        return self._window(self.actions, item + self.start_acts_offset, self.act_buf_len + 1)
 
     def append_buffer(self, buffer):
         """
         buffer is a list of samples (act, obs, rew, terminated, truncated, info)
         don't forget to keep the info dictionary in the sample for CRC debugging
         """
-
-        first_data_idx = self.data[0][-1] + 1 if self.__len__() > 0 else 0
-
-        d0 = [first_data_idx + i for i, _ in enumerate(buffer.memory)]  # indexes
-        d1 = [b[0] for b in buffer.memory]  # actions
-        d2 = [b[1][0] for b in buffer.memory]  # speeds
-        d3 = [b[1][1] for b in buffer.memory]  # lidar
-        d4 = [b[3] or b[4] for b in buffer.memory]  # eoes (terminated or truncated)
-        d5 = [b[2] for b in buffer.memory]  # rewards
-        d6 = [b[5] for b in buffer.memory]  # infos
-        d7 = [b[3] for b in buffer.memory]  # terminated
-        d8 = [b[4] for b in buffer.memory]  # truncated
-
-        if self.__len__() > 0:
-            self.data[0] += d0
-            self.data[1] += d1
-            self.data[2] += d2
-            self.data[3] += d3
-            self.data[4] += d4
-            self.data[5] += d5
-            self.data[6] += d6
-            self.data[7] += d7
-            self.data[8] += d8
-        else:
-            self.data.append(d0)
-            self.data.append(d1)
-            self.data.append(d2)
-            self.data.append(d3)
-            self.data.append(d4)
-            self.data.append(d5)
-            self.data.append(d6)
-            self.data.append(d7)
-            self.data.append(d8)
-
-        to_trim = self.__len__() - self.memory_size
-        if to_trim > 0:
-            self.data[0] = self.data[0][to_trim:]
-            self.data[1] = self.data[1][to_trim:]
-            self.data[2] = self.data[2][to_trim:]
-            self.data[3] = self.data[3][to_trim:]
-            self.data[4] = self.data[4][to_trim:]
-            self.data[5] = self.data[5][to_trim:]
-            self.data[6] = self.data[6][to_trim:]
-            self.data[7] = self.data[7][to_trim:]
-            self.data[8] = self.data[8][to_trim:]
-
+        actions, obs, rewards, terminated, truncated, infos = zip(*buffer.memory)  # single pass over the samples
+        speeds, lidar = zip(*obs)
+        self.append_columns(actions=actions,
+                            speeds=speeds,
+                            imgs=lidar,
+                            eoes=np.logical_or(terminated, truncated),
+                            rewards=rewards,
+                            infos=infos if self.crc_debug else None,
+                            terminated=terminated,
+                            truncated=truncated)
         return self
 
 
 class MemoryTMLidarProgress(MemoryTM):
+    columns = ("actions", "speeds", "imgs", "eoes", "rewards", "infos", "progress", "terminated", "truncated")
+
     def get_transition(self, item):
         """
         CAUTION: item is the first index of the 4 images in the images history of the OLD observation
@@ -345,7 +635,9 @@ class MemoryTMLidarProgress(MemoryTM):
         So we load 5 images from here...
         Don't forget the info dict for CRC debugging
         """
-        if self.data[4][item + self.min_samples - 1]:
+        min_samples = self.min_samples
+        eoes = self.eoes
+        if eoes[self._index(item + min_samples - 1)]:
             if item == 0:  # if first item of the buffer
                 item += 1
             elif item == self.__len__() - 1:  # if last item of the buffer
@@ -355,8 +647,8 @@ class MemoryTMLidarProgress(MemoryTM):
             else:
                 item -= 1
 
-        idx_last = item + self.min_samples - 1
-        idx_now = item + self.min_samples
+        idx_last = self._index(item + min_samples - 1)
+        idx_now = self._index(item + min_samples)
 
         acts = self.load_acts(item)
         last_act_buf = acts[:-1]
@@ -367,96 +659,76 @@ class MemoryTMLidarProgress(MemoryTM):
         imgs_new_obs = imgs[1:]
 
         # if a reset transition has influenced the observation, special care must be taken
-        last_eoes = self.data[4][idx_now - self.min_samples:idx_now]  # self.min_samples values
+        last_eoes = self._window(eoes, item, min_samples)  # min_samples values
         last_eoe_idx = last_true_in_list(last_eoes)  # last occurrence of True
 
         assert last_eoe_idx is None or last_eoes[last_eoe_idx], f"last_eoe_idx:{last_eoe_idx}"
 
         if last_eoe_idx is not None:
-            replace_hist_before_eoe(hist=new_act_buf, eoe_idx_in_hist=last_eoe_idx - self.start_acts_offset - 1)
-            replace_hist_before_eoe(hist=last_act_buf, eoe_idx_in_hist=last_eoe_idx - self.start_acts_offset)
-            replace_hist_before_eoe(hist=imgs_new_obs, eoe_idx_in_hist=last_eoe_idx - self.start_imgs_offset - 1)
-            replace_hist_before_eoe(hist=imgs_last_obs, eoe_idx_in_hist=last_eoe_idx - self.start_imgs_offset)
-
-        imgs_new_obs = np.ndarray.flatten(imgs_new_obs)
-        imgs_last_obs = np.ndarray.flatten(imgs_last_obs)
-
-        last_obs = (self.data[2][idx_last], self.data[7][idx_last], imgs_last_obs, *last_act_buf)
-        new_act = self.data[1][idx_now]
-        rew = np.float32(self.data[5][idx_now])
-        new_obs = (self.data[2][idx_now], self.data[7][idx_now], imgs_new_obs, *new_act_buf)
-        terminated = self.data[8][idx_now]
-        truncated = self.data[9][idx_now]
-        info = self.data[6][idx_now]
+            # histories are padded in place and must not be views of the memory (nor of each other)
+            last_act_buf, new_act_buf = last_act_buf.copy(), new_act_buf.copy()
+            imgs_last_obs, imgs_new_obs = imgs_last_obs.copy(), imgs_new_obs.copy()
+            eoe_idx_in_acts = last_eoe_idx - self.start_acts_offset
+            eoe_idx_in_imgs = last_eoe_idx - self.start_imgs_offset
+            replace_hist_before_eoe(hist=new_act_buf, eoe_idx_in_hist=eoe_idx_in_acts - 1)
+            replace_hist_before_eoe(hist=last_act_buf, eoe_idx_in_hist=eoe_idx_in_acts)
+            replace_hist_before_eoe(hist=imgs_new_obs, eoe_idx_in_hist=eoe_idx_in_imgs - 1)
+            replace_hist_before_eoe(hist=imgs_last_obs, eoe_idx_in_hist=eoe_idx_in_imgs)
+
+        imgs_new_obs = imgs_new_obs.astype(np.float32).ravel()  # LIDARs are stored as int16
+        imgs_last_obs = imgs_last_obs.astype(np.float32).ravel()
+
+        last_obs = (self.speeds[idx_last], self.progress[idx_last], imgs_last_obs, *last_act_buf)
+        new_act = self.actions[idx_now]
+        rew = self.rewards[idx_now]
+        new_obs = (self.speeds[idx_now], self.progress[idx_now], imgs_new_obs, *new_act_buf)
+        terminated = self.terminated[idx_now]
+        truncated = self.truncated[idx_now]
+        info = self.infos[idx_now]
         return last_obs, new_act, rew, new_obs, terminated, truncated, info
 
+    def get_transitions(self, items):
+        items, idx_last, idx_now, last_eoe_idx = self._batch_indices(items)
+        last_act_buf, new_act_buf = self._gather_hists("actions", items, self.start_acts_offset, self.act_buf_len, last_eoe_idx)
+        imgs_last_obs, imgs_new_obs = self._gather_hists("imgs", items, self.start_imgs_offset, self.imgs_obs, last_eoe_idx)
+        imgs_last_obs = imgs_last_obs.reshape(len(items), -1).float()  # LIDARs are stored as int16
+        imgs_new_obs = imgs_new_obs.reshape(len(items), -1).float()
+        last_obs = (self._gather("speeds", idx_last), self._gather("progress", idx_last), imgs_last_obs, *last_act_buf.unbind(1))
+        new_act = self._gather("actions", idx_now)
+        rew = self._gather("rewards", idx_now)
+        new_obs = (self._gather("speeds", idx_now), self._gather("progress", idx_now), imgs_new_obs, *new_act_buf.unbind(1))
+        terminated = self._gather("terminated", idx_now).float()  # we don't want bool tensors
+        truncated = self._gather("truncated", idx_now).float()
+        return last_obs, new_act, rew, new_obs, terminated, truncated
+
     def load_imgs(self, item):
-        res = self.data[3][(item + self.start_imgs_offset):(item + self.start_imgs_offset + self.imgs_obs + 1)]
-        return np.stack(res)
+        return self._window(self.imgs, item + self.start_imgs_offset, self.imgs_obs + 1)
 
     def load_acts(self, item):
-        res = self.data[1][(item + self.start_acts_offset):(item + self.start_acts_offset + self.act_buf_len + 1)]
-        return res
+        return self._window(self.actions, item + self.start_acts_offset, self.act_buf_len + 1)
 
     def append_buffer(self, buffer):
         """
         buffer is a list of samples (act, obs, rew, truncated, terminated, info)
         don't forget to keep the info dictionary in the sample for CRC debugging
         """
-
-        first_data_idx = self.data[0][-1] + 1 if self.__len__() > 0 else 0
-
-        d0 = [first_data_idx + i for i, _ in enumerate(buffer.memory)]  # indexes
-        d1 = [b[0] for b in buffer.memory]  # actions
-        d2 = [b[1][0] for b in buffer.memory]  # speeds
-        d3 = [b[1][2] for b in buffer.memory]  # lidar
-        d4 = [b[3] or b[4] for b in buffer.memory]  # eoes
-        d5 = [b[2] for b in buffer.memory]  # rewards
-        d6 = [b[5] for b in buffer.memory]  # infos
-        d7 = [b[1][1] for b in buffer.memory]  # progress
-        d8 = [b[3] for b in buffer.memory]  # terminated
-        d9 = [b[4] for b in buffer.memory]  # truncated
-
-        if self.__len__() > 0:
-            self.data[0] += d0
-            self.data[1] += d1
-            self.data[2] += d2
-            self.data[3] += d3
-            self.data[4] += d4
-            self.data[5] += d5
-            self.data[6] += d6
-            self.data[7] += d7
-            self.data[8] += d8
-            self.data[9] += d9
-        else:
-            self.data.append(d0)
-            self.data.append(d1)
-            self.data.append(d2)
-            self.data.append(d3)
-            self.data.append(d4)
-            self.data.append(d5)
-            self.data.append(d6)
-            self.data.append(d7)
-            self.data.append(d8)
-            self.data.append(d9)
-
-        to_trim = self.__len__() - self.memory_size
-        if to_trim > 0:
-            self.data[0] = self.data[0][to_trim:]
-            self.data[1] = self.data[1][to_trim:]
-            self.data[2] = self.data[2][to_trim:]
-            self.data[3] = self.data[3][to_trim:]
-            self.data[4] = self.data[4][to_trim:]
-            self.data[5] = self.data[5][to_trim:]
-            self.data[6] = self.data[6][to_trim:]
-            self.data[7] = self.data[7][to_trim:]
-            self.data[8] = self.data[8][to_trim:]
-            self.data[9] = self.data[9][to_trim:]
-
+        actions, obs, rewards, terminated, truncated, infos = zip(*buffer.memory)  # single pass over the samples
+        speeds, progress, lidar = zip(*obs)
+        self.append_columns(actions=actions,
+                            speeds=speeds,
+                            imgs=lidar,
+                            eoes=np.logical_or(terminated, truncated),
+                            rewards=rewards,
+                            infos=infos if self.crc_debug else None,
+                            progress=progress,
+                            terminated=terminated,
+                            truncated=truncated)
         return self
 
 
 class MemoryTMFull(MemoryTM):
+    columns = ("actions", "speeds", "imgs", "eoes", "rewards", "infos", "gears", "rpms", "terminated", "truncated")
+
     def get_transition(self, item):
         """
         CAUTION: item is the first index of the 4 images in the images history of the OLD observation
@@ -466,7 +738,9 @@ class MemoryTMFull(MemoryTM):
         So we load 5 images from here...
         Don't forget the info dict for CRC debugging
         """
-        if self.data[4][item + self.min_samples - 1]:
+        min_samples = self.min_samples
+        eoes = self.eoes
+        if eoes[self._index(item + min_samples - 1)]:
             if item == 0:  # if first item of the buffer
                 item += 1
             elif item == self.__len__() - 1:  # if last item of the buffer
@@ -476,8 +750,8 @@ class MemoryTMFull(MemoryTM):
             else:
                 item -= 1
 
-        idx_last = item + self.min_samples - 1
-        idx_now = item + self.min_samples
+        idx_last = self._index(item + min_samples - 1)
+        idx_now = self._index(item + min_samples)
 
         acts = self.load_acts(item)
         last_act_buf = acts[:-1]
@@ -488,91 +762,67 @@ class MemoryTMFull(MemoryTM):
         imgs_new_obs = imgs[1:]
 
         # if a reset transition has influenced the observation, special care must be taken
-        last_eoes = self.data[4][idx_now - self.min_samples:idx_now]  # self.min_samples values
+        last_eoes = self._window(eoes, item, min_samples)  # min_samples values
         last_eoe_idx = last_true_in_list(last_eoes)  # last occurrence of True
 
         assert last_eoe_idx is None or last_eoes[last_eoe_idx], f"last_eoe_idx:{last_eoe_idx}"
 
         if last_eoe_idx is not None:
-            replace_hist_before_eoe(hist=new_act_buf, eoe_idx_in_hist=last_eoe_idx - self.start_acts_offset - 1)
-            replace_hist_before_eoe(hist=last_act_buf, eoe_idx_in_hist=last_eoe_idx - self.start_acts_offset)
-            replace_hist_before_eoe(hist=imgs_new_obs, eoe_idx_in_hist=last_eoe_idx - self.start_imgs_offset - 1)
-            replace_hist_before_eoe(hist=imgs_last_obs, eoe_idx_in_hist=last_eoe_idx - self.start_imgs_offset)
-
-        last_obs = (self.data[2][idx_last], self.data[7][idx_last], self.data[8][idx_last], imgs_last_obs, *last_act_buf)
-        new_act = self.data[1][idx_now]
-        rew = np.float32(self.data[5][idx_now])
-        new_obs = (self.data[2][idx_now], self.data[7][idx_now], self.data[8][idx_now], imgs_new_obs, *new_act_buf)
-        terminated = self.data[9][idx_now]
-        truncated = self.data[10][idx_now]
-        info = self.data[6][idx_now]
+            # histories are padded in place and must not be views of the memory (nor of each other)
+            last_act_buf, new_act_buf = last_act_buf.copy(), new_act_buf.copy()
+            imgs_last_obs, imgs_new_obs = imgs_last_obs.copy(), imgs_new_obs.copy()
+            eoe_idx_in_acts = last_eoe_idx - self.start_acts_offset
+            eoe_idx_in_imgs = last_eoe_idx - self.start_imgs_offset
+            replace_hist_before_eoe(hist=new_act_buf, eoe_idx_in_hist=eoe_idx_in_acts - 1)
+            replace_hist_before_eoe(hist=last_act_buf, eoe_idx_in_hist=eoe_idx_in_acts)
+            replace_hist_before_eoe(hist=imgs_new_obs, eoe_idx_in_hist=eoe_idx_in_imgs - 1)
+            replace_hist_before_eoe(hist=imgs_last_obs, eoe_idx_in_hist=eoe_idx_in_imgs)
+
+        last_obs = (self.speeds[idx_last], self.gears[idx_last], self.rpms[idx_last], imgs_last_obs, *last_act_buf)
+        new_act = self.actions[idx_now]
+        rew = self.rewards[idx_now]
+        new_obs = (self.speeds[idx_now], self.gears[idx_now], self.rpms[idx_now], imgs_new_obs, *new_act_buf)
+        terminated = self.terminated[idx_now]
+        truncated = self.truncated[idx_now]
+        info = self.infos[idx_now]
         return last_obs, new_act, rew, new_obs, terminated, truncated, info
 
+    def get_transitions(self, items):
+        items, idx_last, idx_now, last_eoe_idx = self._batch_indices(items)
+        last_act_buf, new_act_buf = self._gather_hists("actions", items, self.start_acts_offset, self.act_buf_len, last_eoe_idx)
+        imgs_last_obs, imgs_new_obs = self._gather_hists("imgs", items, self.start_imgs_offset, self.imgs_obs, last_eoe_idx)
+        imgs_last_obs = imgs_last_obs * (1.0 / 256.0)  # float32, converted after the transfer of uint8 images
+        imgs_new_obs = imgs_new_obs * (1.0 / 256.0)
+        last_obs = (self._gather("speeds", idx_last), self._gather("gears", idx_last), self._gather("rpms", idx_last), imgs_last_obs, *last_act_buf.unbind(1))
+        new_act = self._gather("actions", idx_now)
+        rew = self._gather("rewards", idx_now)
+        new_obs = (self._gather("speeds", idx_now), self._gather("gears", idx_now), self._gather("rpms", idx_now), imgs_new_obs, *new_act_buf.unbind(1))
+        terminated = self._gather("terminated", idx_now).float()  # we don't want bool tensors
+        truncated = self._gather("truncated", idx_now).float()
+        return last_obs, new_act, rew, new_obs, terminated, truncated
+
     def load_imgs(self, item):
-        res = self.data[3][(item + self.start_imgs_offset):(item + self.start_imgs_offset + self.imgs_obs + 1)]
-        return np.stack(res).astype(np.float32) / 256.0
+        res = self._window(self.imgs, item + self.start_imgs_offset, self.imgs_obs + 1)
+        return np.multiply(res, np.float32(1.0 / 256.0), out=np.empty(res.shape, dtype=np.float32))
 
     def load_acts(self, item):
-        res = self.data[1][(item + self.start_acts_offset):(item + self.start_acts_offset + self.act_buf_len + 1)]
-        return res
+        return self._window(self.actions, item + self.start_acts_offset, self.act_buf_len + 1)
 
     def append_buffer(self, buffer):
         """
         buffer is a list of samples ( act, obs, rew, terminated, truncated, info)
         don't forget to keep the info dictionary in the sample for CRC debugging
         """
-
-        first_data_idx = self.data[0][-1] + 1 if self.__len__() > 0 else 0
-
-        d0 = [first_data_idx + i for i, _ in enumerate(buffer.memory)]  # indexes
-        d1 = [b[0] for b in buffer.memory]  # actions
-        d2 = [b[1][0] for b in buffer.memory]  # speeds
-        d3 = [b[1][3] for b in buffer.memory]  # images
-        d4 = [b[3] or b[4] for b in buffer.memory]  # eoes
-        d5 = [b[2] for b in buffer.memory]  # rewards
-        d6 = [b[5] for b in buffer.memory]  # infos
-        d7 = [b[1][1] for b in buffer.memory]  # gears
-        d8 = [b[1][2] for b in buffer.memory]  # rpms
-        d9 = [b[3] for b in buffer.memory]  # terminated
-        d10 = [b[4] for b in buffer.memory]  # truncated
-
-        if self.__len__() > 0:
-            self.data[0] += d0
-            self.data[1] += d1
-            self.data[2] += d2
-            self.data[3] += d3
-            self.data[4] += d4
-            self.data[5] += d5
-            self.data[6] += d6
-            self.data[7] += d7
-            self.data[8] += d8
-            self.data[9] += d9
-            self.data[10] += d10
-        else:
-            self.data.append(d0)
-            self.data.append(d1)
-            self.data.append(d2)
-            self.data.append(d3)
-            self.data.append(d4)
-            self.data.append(d5)
-            self.data.append(d6)
-            self.data.append(d7)
-            self.data.append(d8)
-            self.data.append(d9)
-            self.data.append(d10)
-
-        to_trim = self.__len__() - self.memory_size
-        if to_trim > 0:
-            self.data[0] = self.data[0][to_trim:]
-            self.data[1] = self.data[1][to_trim:]
-            self.data[2] = self.data[2][to_trim:]
-            self.data[3] = self.data[3][to_trim:]
-            self.data[4] = self.data[4][to_trim:]
-            self.data[5] = self.data[5][to_trim:]
-            self.data[6] = self.data[6][to_trim:]
-            self.data[7] = self.data[7][to_trim:]
-            self.data[8] = self.data[8][to_trim:]
-            self.data[9] = self.data[9][to_trim:]
-            self.data[10] = self.data[10][to_trim:]
-
+        actions, obs, rewards, terminated, truncated, infos = zip(*buffer.memory)  # single pass over the samples
+        speeds, gears, rpms, imgs = zip(*obs)
+        self.append_columns(actions=actions,
+                            speeds=speeds,
+                            imgs=imgs,
+                            eoes=np.logical_or(terminated, truncated),
+                            rewards=rewards,
+                            infos=infos if self.crc_debug else None,
+                            gears=gears,
+                            rpms=rpms,
+                            terminated=terminated,
+                            truncated=truncated)
         return self
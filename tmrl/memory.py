@@ -4,15 +4,14 @@ import pickle
 import zlib
 from abc import ABC, abstractmethod
 from pathlib import Path
-from random import randint
 import logging
 
 # third-party imports
 import numpy as np
-# from torch.utils.data import DataLoader, Dataset, Sampler
+from torch.utils.data import DataLoader, RandomSampler
 
 # local imports
-from tmrl.util import collate_torch
+from tmrl.util import collate_torch, to_device
 
 
 __docformat__ = "google"
@@ -174,17 +173,26 @@ class Memory(ABC):
         return prev_obs, new_act, rew, new_obs, terminated, truncated
 
     def sample_indices(self):
-        return (randint(0, len(self) - 1) for _ in range(self.batch_size))
+        return np.random.randint(0, len(self), size=self.batch_size)
 
 
 class TorchMemory(Memory, ABC):
     """
     Partial implementation of the `Memory` class collating samples into batched torch tensors.
 
+    When `nb_workers` is greater than 0, batches are sampled and collated by a pool of `DataLoader` worker processes,
+    in parallel with training.
+    Workers are started at the beginning of each round (i.e., each iteration over the memory) with a copy of the memory:
+    samples appended during a round become available at the next round.
+
     .. note::
        When overriding `__init__`, don't forget to call `super().__init__` in the subclass.
        Your `__init__` method needs to take at least all the arguments of the superclass.
     """
+    nb_workers = 0  # default for memories checkpointed before nb_workers existed
+    pin_memory = False
+    prefetch_factor = 2
+
     def __init__(self,
                  device,
                  nb_steps,
@@ -192,7 +200,10 @@ class TorchMemory(Memory, ABC):
                  memory_size=1000000,
                  batch_size=256,
                  dataset_path="",
-                 crc_debug=False):
+                 crc_debug=False,
+                 nb_workers=0,
+                 pin_memory=False,
+                 prefetch_factor=2):
         """
         Args:
             device (str): output tensors will be collated to this device
@@ -202,7 +213,13 @@ class TorchMemory(Memory, ABC):
             batch_size (int): batch size of the output tensors
             dataset_path (str): an offline dataset may be provided here to initialize the memory
             crc_debug (bool): False usually, True when using CRC debugging of the pipeline
+            nb_workers (int): number of worker processes sampling batches (0 for sampling in the main process)
+            pin_memory (bool): if True, sampled batches are copied to page-locked memory for faster transfer to `device`
+            prefetch_factor (int): number of batches sampled in advance by each worker process
         """
+        self.nb_workers = nb_workers
+        self.pin_memory = pin_memory
+        self.prefetch_factor = prefetch_factor
         super().__init__(memory_size=memory_size,
                          batch_size=batch_size,
                          dataset_path=dataset_path,
@@ -211,5 +228,23 @@ class TorchMemory(Memory, ABC):
                          crc_debug=crc_debug,
                          device=device)
 
+    def __iter__(self):
+        if self.nb_workers <= 0:
+            yield from super().__iter__()
+            return
+        sampler = RandomSampler(self, replacement=True, num_samples=self.nb_steps * self.batch_size)
+        loader = DataLoader(self,
+                            batch_size=self.batch_size,
+                            sampler=sampler,
+                            num_workers=self.nb_workers,
+                            collate_fn=self.collate_cpu,
+                            pin_memory=self.pin_memory,
+                            prefetch_factor=self.prefetch_factor)
+        for batch in loader:
+            yield to_device(batch, self.device, non_blocking=self.pin_memory)
+
+    def collate_cpu(self, batch):
+        return self.collate(batch, "cpu")
+
     def collate(self, batch, device):
         return collate_torch(batch, device)
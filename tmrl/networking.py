@@ -1,22 +1,27 @@
 # standard library imports
 import datetime
+import gc
+import io
 import os
+import pickle
 import socket
 import time
 import atexit
-import json
 import shutil
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from os.path import exists
 
 # third-party imports
 import numpy as np
+import torch
 from requests import get
 from tlspyo import Relay, Endpoint
 
 # local imports
 from tmrl.actor import ActorModule
-from tmrl.util import dump, load, partial_to_dict
+from tmrl.util import load, partial_to_dict
 import tmrl.config.config_constants as cfg
 import tmrl.config.config_objects as cfg_obj
 
@@ -179,6 +184,7 @@ class TrainerInterface:
 
         print_with_timestamp(f"server IP: {self.server_ip}")
 
+        self.__lock = threading.Lock()  # the endpoint may be used from several threads
         self.__endpoint.notify(groups={'trainers': -1})  # retrieve everything
 
     def broadcast_model(self, model: ActorModule):
@@ -189,17 +195,19 @@ class TrainerInterface:
         model.save(self.model_path)
         with open(self.model_path, 'rb') as f:
             weights = f.read()
-        self.__endpoint.broadcast(weights, "workers")
+        with self.__lock:
+            self.__endpoint.broadcast(weights, "workers")
 
     def retrieve_buffer(self):
         """
         returns the TrainerInterface's buffer of training samples
         """
-        buffers = self.__endpoint.receive_all()
+        with self.__lock:
+            buffers = self.__endpoint.receive_all()
+            self.__endpoint.notify(groups={'trainers': -1})  # retrieve everything
         res = Buffer()
         for buf in buffers:
             res += buf
-        self.__endpoint.notify(groups={'trainers': -1})  # retrieve everything
         return res
 
 
@@ -222,14 +230,46 @@ def load_run_instance(checkpoint_path):
     return load(checkpoint_path)
 
 
+# checkpoints are pickled in memory, and then written to checkpoint_path (possibly on a network file system) in the background:
+_checkpoint_writer = ThreadPoolExecutor(max_workers=1)
+_pending_checkpoint_write = None
+
+
+def _write_checkpoint(buffer, checkpoint_path):
+    t1 = time.time()
+    tmp_path = f"{checkpoint_path}.part"
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer.getbuffer())  # written from the memory of the BytesIO, without intermediate copies
+    os.replace(tmp_path, checkpoint_path)  # a partially written checkpoint never replaces the previous one
+    logging.info(f" saved checkpoint in {time.time() - t1} seconds.")
+
+
+def wait_checkpoint_write():
+    """
+    Waits until the last checkpoint dumped by dump_run_instance is written to its checkpoint path
+    """
+    global _pending_checkpoint_write
+    if _pending_checkpoint_write is not None:
+        _pending_checkpoint_write.result()
+        _pending_checkpoint_write = None
+
+
 def dump_run_instance(run_instance, checkpoint_path):
     """
     Default function used to dump trainers to checkpoint path
+
+    The trainer is pickled in memory, and then written to checkpoint_path in the background.
+    Call wait_checkpoint_write() to wait for the write to complete.
+
     Args:
         run_instance: the instance of run_cls to checkpoint
         checkpoint_path: the path where instances of run_cls are checkpointed
     """
-    dump(run_instance, checkpoint_path)
+    global _pending_checkpoint_write
+    wait_checkpoint_write()  # at most one checkpoint is held in memory
+    buffer = io.BytesIO()
+    pickle.dump(run_instance, buffer, pickle.HIGHEST_PROTOCOL)  # protocol 5: numpy arrays are pickled from their memory
+    _pending_checkpoint_write = _checkpoint_writer.submit(_write_checkpoint, buffer, checkpoint_path)
 
 
 def iterate_epochs(run_cls,
@@ -246,6 +286,7 @@ def iterate_epochs(run_cls,
     Generator yielding episode statistics (list of pd.Series) while running and checkpointing
     """
     checkpoint_path = checkpoint_path or tempfile.mktemp("_remove_on_exit")
+    run_instance = None
 
     try:
         logging.debug(f"checkpoint_path: {checkpoint_path}")
@@ -268,17 +309,24 @@ def iterate_epochs(run_cls,
         while run_instance.epoch < run_instance.epochs:
             # time.sleep(1)  # on network file systems writing files is asynchronous and we need to wait for sync
             yield run_instance.run_epoch(interface=interface)  # yield stats data frame (this makes this function a generator)
+            # release garbage and cached CUDA blocks at the epoch boundary, where the device sync is harmless:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
             if run_instance.epoch % epochs_between_checkpoints == 0:
                 logging.info(f" saving checkpoint...")
                 t1 = time.time()
                 dump_run_instance_fn(run_instance, checkpoint_path)
-                logging.info(f" saved checkpoint in {time.time() - t1} seconds.")
+                logging.info(f" dumped checkpoint in {time.time() - t1} seconds.")
                 # we delete and reload the run_instance from disk to ensure the exact same code runs regardless of interruptions
                 # del run_instance
                 # gc.collect()  # garbage collection
                 # run_instance = load_run_instance_fn(checkpoint_path)
 
     finally:
+        if hasattr(run_instance, "stop_receiving_buffers"):
+            run_instance.stop_receiving_buffers()  # the buffer receiver thread must not outlive the run
+        wait_checkpoint_write()  # the last checkpoint must be complete before exiting
         if checkpoint_path.endswith("_remove_on_exit") and exists(checkpoint_path):
             os.remove(checkpoint_path)
 
@@ -315,7 +363,8 @@ def run_with_wandb(entity, project, run_id, interface, run_cls, checkpoint_path:
                 time.sleep(10.0)
     # logging.info(config)
     for stats in iterate_epochs(run_cls, interface, checkpoint_path, dump_run_instance_fn, load_run_instance_fn, 1, updater_fn):
-        [wandb.log(json.loads(s.to_json())) for s in stats]
+        for s in stats:  # one pd.Series per round
+            wandb.log({k: (v.item() if hasattr(v, 'item') else v) for k, v in s.to_dict().items()})
 
 
 def run(interface, run_cls, checkpoint_path: str = None, dump_run_instance_fn=None, load_run_instance_fn=None, updater_fn=None):
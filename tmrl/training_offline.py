@@ -1,13 +1,17 @@
 # standard library imports
+import queue
+import threading
 import time
+from collections.abc import Mapping, Sequence
 from dataclasses import dataclass
 
 # third-party imports
+import numpy as np
+import pandas as pd
 import torch
-from pandas import DataFrame
 
 # local imports
-from tmrl.util import pandas_dict
+from tmrl.util import cached_property, to_device
 
 import logging
 
@@ -15,6 +19,93 @@ import logging
 __docformat__ = "google"
 
 
+def _record_stream(obj, stream):
+    if isinstance(obj, torch.Tensor):
+        if obj.is_cuda:
+            obj.record_stream(stream)
+    elif isinstance(obj, Sequence) and not isinstance(obj, str):
+        for o in obj:
+            _record_stream(o, stream)
+    elif isinstance(obj, Mapping):
+        for o in obj.values():
+            _record_stream(o, stream)
+
+
+class _RunningMeans:
+    """
+    Running means of the training statistics of a round.
+
+    None and NaN values are skipped, as in DataFrame.mean(skipna=True).
+    Statistics that never received a value have a NaN mean.
+    """
+    __slots__ = ("sums", "counts")
+
+    def __init__(self):
+        self.sums = {}
+        self.counts = {}
+
+    def update(self, stats):
+        sums, counts = self.sums, self.counts
+        for k, v in stats.items():
+            if v is None or v != v:
+                counts.setdefault(k, 0)
+            else:
+                sums[k] = sums.get(k, 0.0) + v
+                counts[k] = counts.get(k, 0) + 1
+
+    def means(self):
+        sums = self.sums
+        return {k: sums[k] / n if n else float('nan') for k, n in self.counts.items()}
+
+
+class CudaPrefetcher:
+    """
+    Iterates over a loader (e.g., the replay memory) one batch ahead.
+
+    On CUDA devices, the next batch is sampled and moved to the device on a side stream,
+    so that sampling and host-to-device copies overlap with the training step on the current batch.
+    On other devices, or when `side_stream` is False, this simply iterates over the loader.
+    """
+    def __init__(self, loader, device, side_stream=True):
+        """
+        Args:
+            loader (iterable): yields batches (nested structures of tensors)
+            device (str): device on which the batches are used
+            side_stream (bool): if False, the next batch is sampled on the current stream
+                (needed when the loader samples from device tensors that are modified between batches)
+        """
+        self.device = torch.device(device or "cpu")
+        self.stream = torch.cuda.Stream(device=self.device) if side_stream and self.device.type == "cuda" else None
+        self.loader = iter(loader)
+        self._preload()
+
+    def _preload(self):
+        try:
+            if self.stream is None:
+                self.next_batch = next(self.loader)
+            else:
+                with torch.cuda.stream(self.stream):
+                    self.next_batch = to_device(next(self.loader), self.device, non_blocking=True)
+            self.exhausted = False
+        except StopIteration:
+            self.next_batch = None
+            self.exhausted = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.exhausted:
+            raise StopIteration
+        batch = self.next_batch
+        if self.stream is not None:
+            current_stream = torch.cuda.current_stream(self.device)
+            current_stream.wait_stream(self.stream)
+            _record_stream(batch, current_stream)  # the batch was allocated on the side stream
+        self._preload()
+        return batch
+
+
 @dataclass(eq=0)
 class TrainingOffline:
     """
@@ -30,11 +121,16 @@ class TrainingOffline:
         update_model_interval (int): number of training steps between model broadcasts
         update_buffer_interval (int): number of training steps between retrieving buffered samples
         max_training_steps_per_env_step (float): training will pause when above this ratio
-        sleep_between_buffer_retrieval_attempts (float): algorithm will sleep for this amount of time when waiting for needed incoming samples
+        sleep_between_buffer_retrieval_attempts (float): when waiting for needed incoming samples, algorithm will sleep for at most this amount of time between checks
         profiling (bool): if True, run_epoch will be profiled and the profiling will be printed at the end of each epoch
         agent_scheduler (callable): if not None, must be of the form f(Agent, epoch), called at the beginning of each epoch
         start_training (int): minimum number of samples in the replay buffer before starting training
         device (str): device on which the memory will collate training samples
+        nb_workers (int): number of worker processes sampling batches from the memory (0 for sampling in the main process)
+        pin_memory (bool): if True, batches sampled by worker processes are copied to page-locked memory
+        prefetch_factor (int): number of batches sampled in advance by each worker process
+        fetch_factor (int): number of batches gathered at once by the memory (> 1 requires a memory supporting it, e.g., MemoryTM)
+        compile_training_step (bool): if True, the `train` method of the training agent is compiled with torch.compile
     """
     env_cls: type = None  # = GenericGymEnv  # dummy environment, used only to retrieve observation and action spaces if needed
     memory_cls: type = None  # = TorchMemory  # replay memory
@@ -45,18 +141,42 @@ class TrainingOffline:
     update_model_interval: int = 100  # number of training steps between model broadcasts
     update_buffer_interval: int = 100  # number of training steps between retrieving buffered samples
     max_training_steps_per_env_step: float = 1.0  # training will pause when above this ratio
-    sleep_between_buffer_retrieval_attempts: float = 1.0  # algorithm will sleep for this amount of time when waiting for needed incoming samples
+    sleep_between_buffer_retrieval_attempts: float = 1.0  # when waiting for needed incoming samples, algorithm will sleep for at most this amount of time between checks
     profiling: bool = False  # if True, run_epoch will be profiled and the profiling will be printed at the end of each epoch
     agent_scheduler: callable = None  # if not None, must be of the form f(Agent, epoch), called at the beginning of each epoch
     start_training: int = 0  # minimum number of samples in the replay buffer before starting training
     device: str = None  # device on which the model of the TrainingAgent will live
+    nb_workers: int = 0  # number of worker processes sampling batches from the memory (0 for sampling in the main process)
+    pin_memory: bool = True  # if True, batches sampled by worker processes are copied to page-locked memory
+    prefetch_factor: int = 2  # number of batches sampled in advance by each worker process
+    fetch_factor: int = 1  # number of batches gathered at once by the memory (> 1 requires a memory supporting it, e.g., MemoryTM)
+    compile_training_step: bool = False  # if True, the train method of the training agent is compiled with torch.compile
 
     total_updates = 0
 
+    # buffers are retrieved from the interface by a daemon thread (these attributes are not pickled):
+    _received_buffers = cached_property(lambda self: queue.SimpleQueue())
+    _new_samples = cached_property(lambda self: threading.Event())  # set when the thread receives samples
+    _receiver = cached_property(lambda self: None)
+    _stop_receiving = cached_property(lambda self: threading.Event())  # set to stop the thread
+    _receiver_error = cached_property(lambda self: None)  # exception that killed the thread, re-raised by the trainer
+
+    # training step of the agent, compiled on first use if compile_training_step is True (not pickled):
+    _train_step = cached_property(lambda self: torch.compile(self.agent.train, mode="reduce-overhead") if self.compile_training_step else self.agent.train)
+
+    # index of the round statistics, reused as long as the same statistics are logged (not pickled):
+    _stats_keys = cached_property(lambda self: None)
+    _stats_index = cached_property(lambda self: None)
+
     def __post_init__(self):
         device = self.device
         self.epoch = 0
-        self.memory = self.memory_cls(nb_steps=self.steps, device=device)
+        memory_kwargs = {}  # optional arguments, that memories not supporting them may not take
+        if self.nb_workers > 0:
+            memory_kwargs.update(nb_workers=self.nb_workers, pin_memory=self.pin_memory, prefetch_factor=self.prefetch_factor)
+        if self.fetch_factor > 1:
+            memory_kwargs.update(fetch_factor=self.fetch_factor)
+        self.memory = self.memory_cls(nb_steps=self.steps, device=device, **memory_kwargs)
         if type(self.env_cls) == tuple:
             observation_space, action_space = self.env_cls
         else:
@@ -68,10 +188,53 @@ class TrainingOffline:
         self.total_samples = len(self.memory)
         logging.info(f" Initial total_samples:{self.total_samples}")
 
+    def _receive_buffers(self, interface, stop):
+        # polls the interface, backing off up to sleep_between_buffer_retrieval_attempts while no sample comes in:
+        wait = 0.05
+        while not stop.is_set():
+            try:
+                buffer = interface.retrieve_buffer()
+            except Exception as e:
+                self._receiver_error = e
+                self._new_samples.set()  # wakes up the trainer so that it re-raises the exception
+                return
+            if len(buffer) > 0:
+                self._received_buffers.put(buffer)
+                self._new_samples.set()
+                wait = 0.05
+            else:
+                wait = min(2 * wait, max(self.sleep_between_buffer_retrieval_attempts, 0.05))
+            stop.wait(wait)
+
+    def _append_received_buffers(self):
+        while not self._received_buffers.empty():
+            buffer = self._received_buffers.get()
+            self.memory.append(buffer)
+            self.total_samples += len(buffer)
+        if self._receiver is not None and not self._receiver.is_alive():
+            # the thread died: re-raise its exception in the trainer (a new thread is started on the next update)
+            error, self._receiver, self._receiver_error = self._receiver_error, None, None
+            if error is not None:
+                raise error
+
     def update_buffer(self, interface):
-        buffer = interface.retrieve_buffer()
-        self.memory.append(buffer)
-        self.total_samples += len(buffer)
+        if self._receiver is None:
+            self._stop_receiving = threading.Event()
+            self._receiver = threading.Thread(target=self._receive_buffers, args=(interface, self._stop_receiving), daemon=True)
+            self._receiver.start()
+        self._append_received_buffers()
+
+    def stop_receiving_buffers(self):
+        """
+        Stops and joins the thread retrieving buffers from the interface, if any.
+
+        Buffers received but not yet appended to the memory are appended.
+        """
+        if self._receiver is not None:
+            self._stop_receiving.set()
+            self._receiver.join()
+        self._append_received_buffers()
+        self._receiver = None
 
     def check_ratio(self, interface):
         ratio = self.total_updates / self.total_samples if self.total_samples > 0.0 and self.total_samples >= self.start_training else -1.0
@@ -79,10 +242,11 @@ class TrainingOffline:
             logging.info(f" Waiting for new samples")
             while ratio > self.max_training_steps_per_env_step or ratio == -1.0:
                 # wait for new samples
+                self._new_samples.clear()
                 self.update_buffer(interface)
                 ratio = self.total_updates / self.total_samples if self.total_samples > 0.0 and self.total_samples >= self.start_training else -1.0
                 if ratio > self.max_training_steps_per_env_step or ratio == -1.0:
-                    time.sleep(self.sleep_between_buffer_retrieval_attempts)
+                    self._new_samples.wait(timeout=self.sleep_between_buffer_retrieval_attempts)
             logging.info(f" Resuming training")
 
     def run_epoch(self, interface):
@@ -96,37 +260,39 @@ class TrainingOffline:
             logging.info(f"=== epoch {self.epoch}/{self.epochs} ".ljust(20, '=') + f" round {rnd}/{self.rounds} ".ljust(50, '='))
             logging.debug(f"(Training): current memory size:{len(self.memory)}")
 
-            stats_training = []
+            stats_training = _RunningMeans()
 
-            t0 = time.time()
+            t0 = time.perf_counter()
             self.check_ratio(interface)
-            t1 = time.time()
+            t1 = time.perf_counter()
 
             if self.profiling:
                 from pyinstrument import Profiler
                 pro = Profiler()
                 pro.start()
 
-            t2 = time.time()
+            t2 = time.perf_counter()
 
             t_sample_prev = t2
 
-            for batch in self.memory:  # this samples a fixed number of batches
+            # memories stored on device are updated on the current stream, where the next batch must then be sampled:
+            side_stream = not getattr(self.memory, "device_storage", False)
+            for batch in CudaPrefetcher(self.memory, self.device, side_stream=side_stream):  # this samples a fixed number of batches
 
-                t_sample = time.time()
+                t_sample = time.perf_counter()
 
                 if self.total_updates % self.update_buffer_interval == 0:
                     # retrieve local buffer in replay memory
                     self.update_buffer(interface)
 
-                t_update_buffer = time.time()
+                t_update_buffer = time.perf_counter()
 
                 if self.total_updates == 0:
                     logging.info(f"starting training")
 
-                stats_training_dict = self.agent.train(batch)
+                stats_training_dict = self._train_step(batch)
 
-                t_train = time.time()
+                t_train = time.perf_counter()
 
                 stats_training_dict["return_test"] = self.memory.stat_test_return
                 stats_training_dict["return_train"] = self.memory.stat_train_return
@@ -134,23 +300,31 @@ class TrainingOffline:
                 stats_training_dict["episode_length_train"] = self.memory.stat_train_steps
                 stats_training_dict["sampling_duration"] = t_sample - t_sample_prev
                 stats_training_dict["training_step_duration"] = t_train - t_update_buffer
-                stats_training += stats_training_dict,
+                stats_training.update(stats_training_dict)
                 self.total_updates += 1
                 if self.total_updates % self.update_model_interval == 0:
                     # broadcast model weights
                     interface.broadcast_model(self.agent.get_actor())
                 self.check_ratio(interface)
 
-                t_sample_prev = time.time()
+                del batch  # the prefetcher loads the next batch before this one would be released
+
+                t_sample_prev = time.perf_counter()
 
-            t3 = time.time()
+            t3 = time.perf_counter()
 
             round_time = t3 - t0
             idle_time = t1 - t0
             update_buf_time = t2 - t1
             train_time = t3 - t2
             logging.debug(f"round_time:{round_time}, idle_time:{idle_time}, update_buf_time:{update_buf_time}, train_time:{train_time}")
-            stats += pandas_dict(memory_len=len(self.memory), round_time=round_time, idle_time=idle_time, **DataFrame(stats_training).mean(skipna=True)),
+            stats_training_means = stats_training.means()
+            stats_keys = ("memory_len", "round_time", "idle_time", *stats_training_means)
+            if stats_keys != self._stats_keys:
+                self._stats_keys = stats_keys
+                self._stats_index = pd.Index(stats_keys)
+            stats_values = np.array((len(self.memory), round_time, idle_time, *stats_training_means.values()), dtype=np.float64)
+            stats += pd.Series(stats_values, index=self._stats_index),
 
             logging.info(stats[-1].add_prefix("  ").to_string() + '\n')
 
@@ -158,6 +332,7 @@ class TrainingOffline:
                 pro.stop()
                 logging.info(pro.output_text(unicode=True, color=False, show_all=True))
 
+        self.stop_receiving_buffers()
         self.epoch += 1
         return stats
 
@@ -182,7 +357,12 @@ class TorchTrainingOffline(TrainingOffline):
                  profiling: bool = False,
                  agent_scheduler: callable = None,
                  start_training: int = 0,
-                 device: str = None):
+                 device: str = None,
+                 nb_workers: int = 0,
+                 pin_memory: bool = True,
+                 prefetch_factor: int = 2,
+                 fetch_factor: int = 1,
+                 compile_training_step: bool = False):
         """
         Same arguments as `TrainingOffline`, but when `device` is `None` it is selected automatically for torch.
 
@@ -196,11 +376,16 @@ class TorchTrainingOffline(TrainingOffline):
             update_model_interval (int): number of training steps between model broadcasts
             update_buffer_interval (int): number of training steps between retrieving buffered samples
             max_training_steps_per_env_step (float): training will pause when above this ratio
-            sleep_between_buffer_retrieval_attempts (float): algorithm will sleep for this amount of time when waiting for needed incoming samples
+            sleep_between_buffer_retrieval_attempts (float): when waiting for needed incoming samples, algorithm will sleep for at most this amount of time between checks
             profiling (bool): if True, run_epoch will be profiled and the profiling will be printed at the end of each epoch
             agent_scheduler (callable): if not None, must be of the form f(Agent, epoch), called at the beginning of each epoch
             start_training (int): minimum number of samples in the replay buffer before starting training
             device (str): device on which the memory will collate training samples (None for automatic)
+            nb_workers (int): number of worker processes sampling batches from the memory (0 for sampling in the main process)
+            pin_memory (bool): if True, batches sampled by worker processes are copied to page-locked memory
+            prefetch_factor (int): number of batches sampled in advance by each worker process
+            fetch_factor (int): number of batches gathered at once by the memory (> 1 requires a memory supporting it, e.g., MemoryTM)
+            compile_training_step (bool): if True, the `train` method of the training agent is compiled with torch.compile
         """
         device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         super().__init__(env_cls,
@@ -216,4 +401,9 @@ class TorchTrainingOffline(TrainingOffline):
                          profiling,
                          agent_scheduler,
                          start_training,
-                         device)
+                         device,
+                         nb_workers,
+                         pin_memory,
+                         prefetch_factor,
+                         fetch_factor,
+                         compile_training_step)
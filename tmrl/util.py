@@ -60,6 +60,18 @@ def collate_torch(batch, device=None):
         return torch.from_numpy(np.array(batch)).to(device)  # we create a numpy array first to work around https://github.com/pytorch/pytorch/issues/24200
 
 
+def to_device(obj, device, non_blocking=False):
+    """Moves the torch tensors of a nested structure to `device`"""
+    if isinstance(obj, torch.Tensor):
+        return obj.to(device, non_blocking=non_blocking)
+    elif isinstance(obj, Sequence) and not isinstance(obj, str):
+        return type(obj)(to_device(o, device, non_blocking) for o in obj)
+    elif isinstance(obj, Mapping):
+        return type(obj)((key, to_device(obj[key], device, non_blocking)) for key in obj)
+    else:
+        return obj
+
+
 # === catched property =================================================================================================
 
 